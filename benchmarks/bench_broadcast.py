@@ -0,0 +1,143 @@
+"""Рассылка пользователям (/broadcast): скорость, задержка ответов и продолжение после сбоя.
+
+Запуск: python benchmarks/bench_broadcast.py [--users 1000] [--blocked 0.05] [--crash-at 0.5]
+
+Рассылка отправляется через общий планировщик с настоящими лимитами
+(GLOBAL_RATE_LIMIT, CHAT_RATE_LIMIT) в заглушку Bot API из bench_webhook;
+доля --blocked пользователей отвечает 403, как заблокировавшие бота. Пока
+идет рассылка, другие пользователи пишут боту, и замеряется, сколько ждут
+их ответы (PRIORITY_USER): рассылка не должна их задерживать.
+
+Когда отправлена доля --crash-at, процесс «падает» - задачи рассылки
+отменяются без остановки, журнал закрывается. Затем журнал открывается
+заново, как при запуске, и рассылка продолжается. Заглушка считает
+сообщения в каждый чат: никто не должен получить рассылку дважды.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import BlueTeamSupportBot as bot  # noqa: E402
+from bench_webhook import StubAPIError, StubBotAPI  # noqa: E402
+
+ADMIN = 1000
+FIRST_USER_ID = 500000
+# Пользователи, которые пишут боту во время рассылки
+CHATTING_USER_ID = 900000
+
+
+class BroadcastBotAPI(StubBotAPI):
+    """Заглушка Bot API, которая считает сообщения в каждый чат и отвечает 403 заблокировавшим бота."""
+
+    def __init__(self, blocked):
+        super().__init__()
+        self.blocked = blocked
+        self.received = Counter()
+
+    async def _call(self, method, params):
+        if method in ("sendMessage", "copyMessage"):
+            chat_id = int(params["chat_id"])
+            if chat_id in self.blocked:
+                raise StubAPIError(403, "Forbidden: bot was blocked by the user")
+            self.received[chat_id] += 1
+        return await super()._call(method, params)
+
+
+async def wait_sent(count):
+    """Ждет, пока в журнале у рассылки №1 не наберется count завершенных отправок."""
+    while True:
+        counts = bot.broadcasts.counts(1)
+        if sum(counts.values()) - counts.get("pending", 0) - counts.get("sending", 0) >= count:
+            return
+        await asyncio.sleep(0.05)
+
+
+async def chat_while_broadcasting(application, stop, waits):
+    """Отвечает пишущим боту пользователям, пока идет рассылка, и записывает время ответа."""
+    user_id = CHATTING_USER_ID
+    while not stop.is_set():
+        started = time.perf_counter()
+        await application.bot.send_message(chat_id=user_id, text="Сообщение получено")
+        waits.append(time.perf_counter() - started)
+        user_id += 1
+        await asyncio.sleep(0.5)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000, help="получателей рассылки")
+    parser.add_argument("--blocked", type=float, default=0.05, help="доля заблокировавших бота")
+    parser.add_argument("--crash-at", type=float, default=0.5, help="после какой доли отправок процесс падает")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    bot.ADMIN_IDS = {ADMIN}
+    bot.BROADCAST_PROGRESS_INTERVAL = 3600
+    path = os.path.join(tempfile.mkdtemp(), "broadcasts.sqlite3")
+
+    bot.storage = bot.MemoryStorage()
+    for i in range(args.users):
+        bot.storage.add_message(FIRST_USER_ID + i, bot.MessageRecord(bot.MessageKind.TEXT, bot.Sender.USER, "Вопрос"))
+    step = round(1 / args.blocked) if args.blocked else 0
+    blocked = {FIRST_USER_ID + i for i in range(0, args.users, step)} if step else set()
+    api = BroadcastBotAPI(blocked)
+    await api.start()
+    application = bot.build_application(base_url=api.base_url)
+    await application.initialize()
+
+    bot.broadcasts = bot.BroadcastJournal(path)
+    recipients = bot.broadcast_recipients("all")
+    job_id = bot.broadcasts.create(ADMIN, "send_message", {"text": "Плановые работы в субботу"}, "all", recipients)
+    bot.broadcasts.set_status_message(job_id, 1)
+    bot.broadcasts.set_state(job_id, "running", "draft")
+
+    stop = asyncio.Event()
+    waits = []
+    chatting = asyncio.create_task(chat_while_broadcasting(application, stop, waits))
+    started = time.perf_counter()
+    bot.start_broadcast(application.bot, job_id)
+    await wait_sent(int(len(recipients) * args.crash_at))
+    # Сбой процесса: отправки обрываются на полпути, журнал не узнает их итог
+    for task in list(bot.broadcast_tasks):
+        task.cancel()
+    await asyncio.gather(*bot.broadcast_tasks, return_exceptions=True)
+    before_crash = time.perf_counter() - started
+    bot.broadcasts.close()
+
+    started = time.perf_counter()
+    bot.broadcasts = bot.BroadcastJournal(path)
+    for interrupted in bot.broadcasts.interrupted():
+        bot.start_broadcast(application.bot, interrupted)
+    await asyncio.gather(*bot.broadcast_tasks)
+    after_crash = time.perf_counter() - started
+    stop.set()
+    await chatting
+    counts = bot.broadcasts.counts(job_id)
+    bot.broadcasts.close()
+    await application.shutdown()
+    await api.stop()
+
+    delivered = sum(count for chat_id, count in api.received.items() if chat_id < CHATTING_USER_ID)
+    duplicates = sum(1 for chat_id, count in api.received.items() if chat_id < CHATTING_USER_ID and count > 1)
+    elapsed = before_crash + after_crash
+    waits.sort()
+    print(f"{len(recipients)} получателей, из них заблокировали бота: {len(blocked)}, "
+          f"лимит {bot.GLOBAL_RATE_LIMIT} сообщений/с")
+    print(f"  отправка: {elapsed:.1f} с ({(delivered + counts.get('blocked', 0)) / elapsed:.1f} запросов/с), "
+          f"сбой после {before_crash:.1f} с")
+    print(f"  итог: отправлено {counts.get('sent', 0)}, заблокировали {counts.get('blocked', 0)}, "
+          f"ошибок {counts.get('failed', 0)}, прервано сбоем {counts.get('unknown', 0)}")
+    print(f"  доставлено сообщений: {delivered}, получили дважды: {duplicates}")
+    if waits:
+        print(f"  ответы пользователям во время рассылки: {len(waits)}, "
+              f"задержка p50 {waits[len(waits) // 2] * 1000:.0f} мс, максимум {waits[-1] * 1000:.0f} мс")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
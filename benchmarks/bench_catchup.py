@@ -0,0 +1,116 @@
+"""Обработка обновлений, накопившихся за время остановки: сводки против обычной обработки.
+
+Запуск: python benchmarks/bench_catchup.py [--updates 2000] [--users 200] [--admins 3]
+
+Заглушка Bot API из bench_webhook отдает через getUpdates пачку сообщений,
+пришедших, пока бот был остановлен. Бот запускается как в рабочем режиме
+(build_application, post_init, long polling) трижды:
+  catch_up  - обработка при запуске со сводкой на пользователя (CATCHUP_ENABLED);
+  cap       - то же, но полностью обрабатываются только последние --cap обновлений;
+  live      - накопившиеся обновления обрабатываются как обычные, по одному уведомлению.
+Лимиты отправки отключены; для сравнения выводится оценка времени отправки
+при общем лимите Telegram (GLOBAL_RATE_LIMIT сообщений в секунду).
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import BlueTeamSupportBot as bot  # noqa: E402
+from bench_webhook import StubBotAPI, make_update  # noqa: E402
+
+FIRST_ADMIN_ID = 1000
+FIRST_USER_ID = 500000
+# Сколько секунд без новых запросов считать окончанием обычной обработки
+IDLE_TIME = bot.COALESCE_WINDOW + 1
+
+
+class MethodCountingBotAPI(StubBotAPI):
+    """Заглушка Bot API, которая считает вызовы по методам и время последнего."""
+
+    def __init__(self):
+        super().__init__()
+        self.methods = Counter()
+        self.last_call = 0.0
+
+    async def _call(self, method, params):
+        if method not in ("getUpdates", "getMe", "getWebhookInfo", "deleteWebhook"):
+            self.methods[method] += 1
+            self.last_call = time.perf_counter()
+        return await super()._call(method, params)
+
+
+async def run_mode(mode, args):
+    api = MethodCountingBotAPI()
+    await api.start()
+    for i in range(args.updates):
+        api.pending.append(make_update(i + 1, FIRST_USER_ID + i % args.users, f"Сообщение {i}"))
+
+    bot.storage = bot.MemoryStorage()
+    bot.OUTBOX_PATH = os.path.join(tempfile.mkdtemp(), "outbox.sqlite3")
+    bot.CATCHUP_MAX_UPDATES = args.cap if mode == "cap" else args.updates
+    bot.user_bursts.clear()
+    unlimited = float("inf")
+    bot.outbound_scheduler = bot.OutboundScheduler(
+        global_rate=unlimited, chat_rate=unlimited, chat_burst=unlimited, group_rate=unlimited
+    )
+    run_catch_up = bot.run_catch_up
+    if mode == "live":
+        async def skip_catch_up(application):
+            pass
+
+        bot.run_catch_up = skip_catch_up
+
+    application = bot.build_application(base_url=api.base_url)
+    started = time.perf_counter()
+    await application.initialize()
+    await application.post_init(application)
+    await application.updater.start_polling(poll_interval=0, timeout=1, drop_pending_updates=False)
+    await application.start()
+    # Ждем, пока все накопившиеся обновления будут забраны и запросы перестанут идти
+    while api.pending or time.perf_counter() - max(api.last_call, started) < IDLE_TIME:
+        await asyncio.sleep(0.1)
+    await bot.join_fanout()
+    elapsed = api.last_call - started
+
+    await application.updater.stop()
+    await application.stop()
+    await application.post_stop(application)
+    await application.shutdown()
+    await application.post_shutdown(application)
+    bot.run_catch_up = run_catch_up
+    api.new_update.set()
+    await asyncio.sleep(0.1)
+    await api.stop()
+    return elapsed, api.methods
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=2000, help="накопившихся сообщений")
+    parser.add_argument("--users", type=int, default=200, help="разных пользователей")
+    parser.add_argument("--admins", type=int, default=3)
+    parser.add_argument("--cap", type=int, default=500, help="CATCHUP_MAX_UPDATES в режиме cap")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    bot.ADMIN_IDS = {FIRST_ADMIN_ID + i for i in range(args.admins)}
+    bot.ADMIN_ID = FIRST_ADMIN_ID
+    bot.UPDATE_MODE = "polling"
+
+    print(f"{args.updates} накопившихся сообщений от {args.users} пользователей, администраторов: {args.admins}")
+    print(f"{'режим':<10}{'время, с':>10}{'запросов':>10}{'sendMessage':>13}{'edit':>7}{f'при {bot.GLOBAL_RATE_LIMIT}/с':>12}")
+    for mode in ("catch_up", "cap", "live"):
+        elapsed, methods = await run_mode(mode, args)
+        calls = sum(methods.values())
+        print(f"{mode:<10}{elapsed:>10.2f}{calls:>10}{methods['sendMessage']:>13}{methods['editMessageText']:>7}"
+              f"{calls / bot.GLOBAL_RATE_LIMIT:>10.0f} с")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
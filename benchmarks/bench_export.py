@@ -0,0 +1,104 @@
+"""Выгрузка переписки (/export): время, размер файлов и задержка цикла событий.
+
+Запуск: python benchmarks/bench_export.py [--messages 1000000] [--users 10000] [--format jsonl]
+
+Заполняет SQLiteStorage сообщениями и выгружает всю переписку так же, как
+/export all (send_export с заглушкой context.bot). Пока идет выгрузка,
+фоновая задача каждые 10 мс проверяет, насколько опаздывает цикл событий,
+- так видно, задерживает ли выгрузка обработку обновлений. Рост памяти
+процесса во время выгрузки показывает, что она не собирается в памяти целиком.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import BlueTeamSupportBot as bot  # noqa: E402
+
+FIRST_USER_ID = 500000
+TICK = 0.01
+
+
+class StubBot:
+    """Заглушка context.bot: запоминает размеры отправленных документов."""
+
+    def __init__(self):
+        self.documents = []
+
+    async def send_document(self, chat_id, document, filename, caption, **kwargs):
+        self.documents.append((filename, len(document.read())))
+
+
+class StubStatus:
+    async def edit_text(self, text):
+        self.text = text
+
+
+def rss_mb():
+    """Текущая резидентная память процесса (Linux)."""
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+async def measure_lag(stop, lags, rss):
+    """Записывает, на сколько позже срабатывает sleep(TICK), и память процесса, пока не установлен stop."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+        rss.append(rss_mb())
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1000000)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    storage = bot.SQLiteStorage(os.path.join(tempfile.mkdtemp(), "bench.sqlite3"))
+    for i in range(args.messages):
+        if i % 4:
+            record = bot.MessageRecord(bot.MessageKind.TEXT, bot.Sender.USER, f"Сообщение номер {i} о проблеме с доступом")
+        else:
+            record = bot.MessageRecord(bot.MessageKind.PHOTO, bot.Sender.USER, None, f"AgACAgIAAxkBAAI{i:012d}")
+        storage.add_message(FIRST_USER_ID + i % args.users, record)
+        if i % 10000 == 9999:
+            storage.flush()
+    storage.flush()
+    # Истории, загруженные при заполнении, выгрузке не нужны
+    storage.messages.clear()
+    bot.storage = storage
+    rss = [rss_mb()]
+
+    context = SimpleNamespace(bot=StubBot())
+    stop = asyncio.Event()
+    lags = []
+    lag_task = asyncio.create_task(measure_lag(stop, lags, rss))
+    started = time.perf_counter()
+    await bot.send_export(context, 1, StubStatus(), None, None, args.format)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+    await storage.close()
+
+    lags.sort()
+    sizes = [size for _, size in context.bot.documents]
+    print(f"{args.messages} сообщений от {args.users} пользователей, формат {args.format}")
+    print(f"  время выгрузки: {elapsed:.2f} с ({args.messages / elapsed:,.0f} записей/с)")
+    print(f"  файлов: {len(sizes)}, всего {sum(sizes) / 1024 / 1024:.1f} МБ, "
+          f"наибольший {max(sizes, default=0) / 1024 / 1024:.1f} МБ")
+    print(f"  задержка цикла событий: p50 {lags[len(lags) // 2] * 1000:.1f} мс, "
+          f"p99 {lags[int(len(lags) * 0.99)] * 1000:.1f} мс, максимум {lags[-1] * 1000:.1f} мс")
+    print(f"  память процесса: {rss[0]:.0f} МБ до выгрузки, до {max(rss):.0f} МБ во время нее")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,426 @@
+"""Нагрузочный замер обработчиков бота без Telegram.
+
+Запуск: python benchmarks/bench_handlers.py [--scale 0.1] [--json results.json] [--compare old.json]
+
+Настоящие обработчики (start, handle_all_messages, callback_handler, admin_reply,
+send_history_with_media, статистика) получают синтетические Update, а context.bot
+заменен заглушкой StubBot: она отвечает с заданной задержкой, может случайно
+возвращать 429 (RetryAfter) и пропускает все вызовы через OutboundScheduler,
+как настоящий бот. Сценарии:
+
+  users_messages  - N пользователей (/start и по M сообщений), A администраторов
+                    (с --admin-group - одна группа с темами вместо личных чатов)
+  admin_reply     - нажатие «Ответить» (с показом истории) и ответ администратора
+  history_replay  - воспроизведение истории из 1000 записей целиком и повторные
+                    открытия, когда с прошлого просмотра пришло 2 сообщения
+  stats           - экран статистики при 1 000 000 сохраненных сообщений
+
+Для каждого обработчика выводятся число вызовов, пропускная способность и
+задержки p50/p95/p99. С --json результаты сохраняются в файл, который можно
+сравнить с прошлым прогоном через --compare.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import BlueTeamSupportBot as bot  # noqa: E402
+from telegram import Update  # noqa: E402
+from telegram.error import RetryAfter  # noqa: E402
+
+FIRST_USER_ID = 1000000
+FIRST_ADMIN_ID = 900000
+
+
+class StubBot:
+    """Заглушка context.bot: любой метод send_*/edit_*/answer_* отвечает после задержки.
+
+    Вызовы проходят через OutboundScheduler (как rate_limiter у настоящего бота),
+    поэтому приоритеты, лимиты и повторы после 429 работают так же.
+    """
+
+    defaults = None
+
+    def __init__(self, scheduler, latency=0.0, retry_after_rate=0.0, retry_after=0.05, seed=1):
+        self.scheduler = scheduler
+        self.latency = latency
+        self.retry_after_rate = retry_after_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.retry_after_sent = 0
+        self._message_id = 0
+
+    def __getattr__(self, name):
+        if not name.startswith(("send_", "edit_", "answer_", "copy_", "forward_", "delete_", "create_")):
+            raise AttributeError(name)
+        # send_message -> sendMessage, как endpoint у настоящего бота
+        first, *rest = name.split("_")
+        endpoint = first + "".join(part.title() for part in rest)
+
+        async def method(*args, rate_limit_args=None, **kwargs):
+            async def call():
+                return await self._respond(kwargs)
+
+            return await self.scheduler.process_request(call, (), {}, endpoint, kwargs, rate_limit_args)
+
+        return method
+
+    async def _respond(self, data):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.retry_after_rate and self.rng.random() < self.retry_after_rate:
+            self.retry_after_sent += 1
+            raise RetryAfter(timedelta(seconds=self.retry_after))
+        self._message_id += 1
+        media = data.get("media")
+        if media is not None:
+            return [SimpleNamespace(message_id=self._message_id + i) for i in range(len(media))]
+        return SimpleNamespace(
+            message_id=self._message_id, chat_id=data.get("chat_id"), message_thread_id=self._message_id
+        )
+
+
+class Driver:
+    """Создает синтетические Update и вызывает обработчики, записывая время каждого вызова."""
+
+    def __init__(self, stub):
+        self.stub = stub
+        self.update_id = 0
+        self.user_data = {}
+        self.timings = {}
+
+    def context(self, user_id, args=None):
+        return SimpleNamespace(
+            bot=self.stub,
+            user_data=self.user_data.setdefault(user_id, {}),
+            args=args or [],
+            bot_data={},
+            application=None,
+        )
+
+    def _next_id(self):
+        self.update_id += 1
+        return self.update_id
+
+    @staticmethod
+    def _user(user_id):
+        return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}", "username": f"u{user_id}"}
+
+    def message_update(self, user_id, text=None, photo=None, caption=None):
+        message = {
+            "message_id": self._next_id(),
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": self._user(user_id),
+        }
+        if text is not None:
+            message["text"] = text
+        if photo is not None:
+            message["photo"] = [{"file_id": photo, "file_unique_id": photo, "width": 800, "height": 600}]
+            if caption:
+                message["caption"] = caption
+        return Update.de_json({"update_id": self.update_id, "message": message}, self.stub)
+
+    def callback_update(self, user_id, data):
+        update_id = self._next_id()
+        query = {
+            "id": str(update_id),
+            "from": self._user(user_id),
+            "chat_instance": str(user_id),
+            "data": data,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "text": "menu",
+            },
+        }
+        return Update.de_json({"update_id": update_id, "callback_query": query}, self.stub)
+
+    async def run(self, name, handler, update, context):
+        started = time.perf_counter()
+        await handler(update, context)
+        self.timings.setdefault(name, []).append(time.perf_counter() - started)
+
+    async def call(self, name, coroutine):
+        started = time.perf_counter()
+        await coroutine
+        self.timings.setdefault(name, []).append(time.perf_counter() - started)
+
+
+def summarize(timings, seconds, extra=None):
+    ordered = sorted(timings)
+
+    def percentile(share):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * share))] * 1000, 3)
+
+    result = {
+        "ops": len(ordered),
+        "seconds": round(seconds, 3),
+        "throughput_per_s": round(len(ordered) / seconds, 1) if seconds else None,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+    result.update(extra or {})
+    return result
+
+
+async def start_services(args):
+    """Готовит хранилище, планировщик и очередь рассылки, как post_init в рабочем режиме."""
+    if args.storage == "sqlite":
+        path = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+        bot.storage = bot.SQLiteStorage(path)
+    else:
+        bot.storage = bot.MemoryStorage()
+    bot.user_states.clear()
+    bot.OUTBOX_PATH = "" if args.no_outbox else os.path.join(tempfile.mkdtemp(), "outbox.sqlite3")
+    if args.real_limits:
+        scheduler = bot.OutboundScheduler()
+    else:
+        unlimited = float("inf")
+        scheduler = bot.OutboundScheduler(
+            global_rate=unlimited, chat_rate=unlimited, chat_burst=unlimited, group_rate=unlimited
+        )
+    bot.outbound_scheduler = scheduler
+    await scheduler.initialize()
+    await bot.post_init(None)
+    stub = StubBot(scheduler, args.latency_ms / 1000, args.retry_after_rate, args.retry_after_ms / 1000)
+    return Driver(stub)
+
+
+async def stop_services():
+    await bot.post_stop(None)
+    await bot.post_shutdown(None)
+    await bot.outbound_scheduler.shutdown()
+
+
+def scenario_extra(driver, calls_before, retry_before):
+    return {
+        "api_calls": driver.stub.calls - calls_before,
+        "retry_after": driver.stub.retry_after_sent - retry_before,
+    }
+
+
+async def scenario_users_messages(args, driver, results):
+    users = max(1, int(args.users * args.scale))
+    rng = random.Random(42)
+    user_ids = [FIRST_USER_ID + i for i in range(users)]
+    calls_before, retry_before = driver.stub.calls, driver.stub.retry_after_sent
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def conversation(user_id):
+        # Обновления одного пользователя обрабатываются по порядку
+        async with semaphore:
+            await driver.run("start", bot.start, driver.message_update(user_id, "/start"), driver.context(user_id))
+            for n in range(args.messages):
+                if rng.random() < 0.2:
+                    update = driver.message_update(user_id, photo=f"photo-{user_id}-{n}", caption=f"Фото {n}")
+                else:
+                    update = driver.message_update(user_id, f"Сообщение {n} от пользователя {user_id}")
+                await driver.run("handle_all_messages", bot.handle_all_messages, update, driver.context(user_id))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(conversation(user_id) for user_id in user_ids))
+    handlers_done = time.perf_counter()
+    # Рассылка администраторам идет в фоне - дожидаемся ее, чтобы учесть в пропускной способности
+    await bot.join_fanout()
+    finished = time.perf_counter()
+
+    extra = scenario_extra(driver, calls_before, retry_before)
+    extra.update(users=users, messages_per_user=args.messages, admins=len(bot.ADMIN_IDS),
+                 fanout_drain_s=round(finished - handlers_done, 3))
+    results["users_messages"] = summarize(driver.timings.pop("handle_all_messages"), finished - started, extra)
+    results["start"] = summarize(driver.timings.pop("start"), handlers_done - started)
+    return user_ids
+
+
+async def scenario_admin_reply(args, driver, results, user_ids):
+    admin_id = min(bot.ADMIN_IDS)
+    sample = user_ids[: max(1, int(args.replies * args.scale))]
+    calls_before, retry_before = driver.stub.calls, driver.stub.retry_after_sent
+    started = time.perf_counter()
+    for user_id in sample:
+        await driver.run("callback_handler", bot.callback_handler,
+                         driver.callback_update(admin_id, f"reply_{user_id}"), driver.context(admin_id))
+        await driver.run("admin_reply", bot.admin_reply,
+                         driver.message_update(admin_id, f"Ответ для {user_id}"), driver.context(admin_id))
+    seconds = time.perf_counter() - started
+    extra = scenario_extra(driver, calls_before, retry_before)
+    results["callback_reply"] = summarize(driver.timings.pop("callback_handler"), seconds, extra)
+    results["admin_reply"] = summarize(driver.timings.pop("admin_reply"), seconds)
+
+
+def fill_history(user_id, entries, rng):
+    """Заполняет историю пользователя смесью текстов, фото, документов, голосовых и стикеров."""
+    kinds = [bot.MessageKind.TEXT] * 6 + [bot.MessageKind.PHOTO] * 2 + [
+        bot.MessageKind.DOCUMENT, bot.MessageKind.VOICE, bot.MessageKind.STICKER]
+    bot.storage.ensure_user(user_id)
+    for i in range(entries):
+        kind = rng.choice(kinds)
+        sender = bot.Sender.USER if rng.random() < 0.7 else bot.Sender.ADMIN
+        text = f"Запись истории {i}" if kind in (bot.MessageKind.TEXT, bot.MessageKind.DOCUMENT) else None
+        file_id = None if kind == bot.MessageKind.TEXT else f"file-{user_id}-{i}"
+        bot.storage.add_message(user_id, bot.MessageRecord(kind, sender, text, file_id))
+
+
+async def scenario_history_replay(args, driver, results):
+    user_id = FIRST_USER_ID - 1
+    admin_id = min(bot.ADMIN_IDS)
+    fill_history(user_id, args.history, random.Random(7))
+    calls_before, retry_before = driver.stub.calls, driver.stub.retry_after_sent
+    page_size = bot.HISTORY_PAGE_SIZE
+    # Вся история за один показ, каждый раз как при первом открытии
+    bot.HISTORY_PAGE_SIZE = args.history
+    started = time.perf_counter()
+    for _ in range(args.replays):
+        bot.history_seen.clear()
+        await driver.call("send_history_with_media",
+                          bot.send_history_with_media(driver.context(admin_id), admin_id, user_id))
+    bot.HISTORY_PAGE_SIZE = page_size
+    extra = scenario_extra(driver, calls_before, retry_before)
+    extra.update(entries=args.history, api_calls_per_replay=extra["api_calls"] / args.replays)
+    results["history_replay"] = summarize(
+        driver.timings.pop("send_history_with_media"), time.perf_counter() - started, extra
+    )
+
+    # Повторные открытия: показываются только новые записи
+    calls_before, retry_before = driver.stub.calls, driver.stub.retry_after_sent
+    started = time.perf_counter()
+    for i in range(args.replays):
+        for j in range(2):
+            bot.storage.add_message(user_id, bot.MessageRecord(bot.MessageKind.TEXT, bot.Sender.USER, f"Новое {i}.{j}"))
+        await driver.call("send_history_with_media",
+                          bot.send_history_with_media(driver.context(admin_id), admin_id, user_id))
+    extra = scenario_extra(driver, calls_before, retry_before)
+    extra.update(api_calls_per_replay=extra["api_calls"] / args.replays)
+    results["history_revisit"] = summarize(
+        driver.timings.pop("send_history_with_media"), time.perf_counter() - started, extra
+    )
+
+
+async def scenario_stats(args, driver, results):
+    total = int(args.stored * args.scale)
+    have = bot.storage.message_count()
+    rng = random.Random(3)
+    users = max(1, total // 100)
+    record = bot.MessageRecord(bot.MessageKind.TEXT, bot.Sender.USER, "Сообщение для статистики")
+    for i in range(max(0, total - have)):
+        bot.storage.add_message(FIRST_USER_ID + args.users + rng.randrange(users), record)
+        if i % 10000 == 0:
+            await asyncio.sleep(0)
+
+    admin_id = min(bot.ADMIN_IDS)
+    started = time.perf_counter()
+    for _ in range(args.stats_calls):
+        await driver.run("show_bot_statistics", bot.handle_keyboard_buttons,
+                         driver.message_update(admin_id, "📊 Статистика"), driver.context(admin_id))
+        await driver.run("menu_stats", bot.callback_handler,
+                         driver.callback_update(admin_id, "menu_stats"), driver.context(admin_id))
+    seconds = time.perf_counter() - started
+    extra = {"stored_messages": bot.storage.message_count()}
+    results["stats_button"] = summarize(driver.timings.pop("show_bot_statistics"), seconds, extra)
+    results["stats_menu"] = summarize(driver.timings.pop("menu_stats"), seconds, extra)
+
+
+def print_results(results):
+    print(f"{'сценарий':<18} {'вызовов':>8} {'в сек':>10} {'p50 мс':>9} {'p95 мс':>9} {'p99 мс':>9} {'API':>8} {'429':>5}")
+    for name, result in results.items():
+        print(f"{name:<18} {result['ops']:>8} {result['throughput_per_s'] or 0:>10.1f} {result['p50_ms']:>9.3f} "
+              f"{result['p95_ms']:>9.3f} {result['p99_ms']:>9.3f} {result.get('api_calls', ''):>8} "
+              f"{result.get('retry_after', ''):>5}")
+
+
+def print_comparison(results, previous):
+    print("\nСравнение с прошлым прогоном (изменение, %):")
+    for name, result in results.items():
+        old = previous.get(name)
+        if not old:
+            continue
+        changes = []
+        for key in ("throughput_per_s", "p50_ms", "p95_ms", "p99_ms"):
+            if old.get(key) and result.get(key) is not None:
+                changes.append(f"{key} {(result[key] / old[key] - 1) * 100:+.1f}")
+        print(f"  {name}: " + ", ".join(changes))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--scale", type=float, default=1.0, help="множитель размеров сценариев")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--messages", type=int, default=5, help="сообщений на пользователя")
+    parser.add_argument("--admins", type=int, default=5)
+    parser.add_argument("--replies", type=int, default=1000, help="ответов администратора")
+    parser.add_argument("--history", type=int, default=1000, help="записей в воспроизводимой истории")
+    parser.add_argument("--replays", type=int, default=20)
+    parser.add_argument("--stored", type=int, default=1000000, help="сообщений в хранилище для статистики")
+    parser.add_argument("--stats-calls", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=1, help="пользователей, обрабатываемых одновременно")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="задержка ответа заглушки Bot API")
+    parser.add_argument("--retry-after-rate", type=float, default=0.0, help="доля запросов с ответом 429")
+    parser.add_argument("--retry-after-ms", type=float, default=50.0, help="retry_after в ответе 429")
+    parser.add_argument("--real-limits", action="store_true", help="лимиты Telegram в планировщике")
+    parser.add_argument("--storage", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--no-outbox", action="store_true", help="доставка без журнала outbox")
+    parser.add_argument("--forward-mode", choices=("copy", "resend"), default=bot.FORWARD_MODE,
+                        help="как медиафайлы пересылаются администраторам (FORWARD_MODE)")
+    parser.add_argument("--admin-group", action="store_true",
+                        help="уведомления в группу администраторов с темами (ADMIN_GROUP_ID)")
+    parser.add_argument("--scenarios", default="users_messages,admin_reply,history_replay,stats")
+    parser.add_argument("--json", help="сохранить результаты в файл")
+    parser.add_argument("--compare", help="сравнить с результатами из файла")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    # Обработчики подробно пишут в лог; для замера он не нужен
+    logging.disable(logging.WARNING)
+    bot.ADMIN_IDS.clear()
+    bot.ADMIN_IDS.update(FIRST_ADMIN_ID + i for i in range(args.admins))
+    bot.FORWARD_MODE = args.forward_mode
+    bot.ADMIN_GROUP_ID = -1001000000000 if args.admin_group else 0
+    scenarios = args.scenarios.split(",")
+
+    driver = await start_services(args)
+    results = {}
+    user_ids = [FIRST_USER_ID]
+    if "users_messages" in scenarios:
+        user_ids = await scenario_users_messages(args, driver, results)
+    if "admin_reply" in scenarios:
+        await scenario_admin_reply(args, driver, results, user_ids)
+    if "history_replay" in scenarios:
+        await scenario_history_replay(args, driver, results)
+    if "stats" in scenarios:
+        await scenario_stats(args, driver, results)
+    await stop_services()
+
+    print_results(results)
+    report = {
+        "config": {key: value for key, value in vars(args).items() if key not in ("json", "compare")},
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(results, json.load(f)["results"])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
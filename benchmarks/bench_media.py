@@ -0,0 +1,84 @@
+"""Память на историю с медиафайлами: своя строка file_id в каждой записи против реестра MediaRegistry.
+
+Запуск: python benchmarks/bench_media.py [--messages 200000] [--distinct 0.3]
+
+Пользователи присылают медиафайлы, часть которых повторяется (стикеры,
+пересланные картинки, один и тот же документ). Telegram выдает при каждой
+пересылке новый file_id, а file_unique_id у файла один, поэтому без реестра
+каждая запись хранит свою строку file_id, а с реестром - ссылку на общий
+MediaItem. Строки file_id создаются во время замера, как при получении
+сообщений, и остаются в памяти, только если на них ссылается история.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import BlueTeamSupportBot as bot  # noqa: E402
+
+FIRST_USER_ID = 500000
+USERS = 1000
+
+
+def make_source(count, distinct):
+    """Сообщения: (пользователь, номер файла); популярные файлы повторяются чаще."""
+    rng = random.Random(42)
+    files = max(1, int(count * distinct))
+    # Каждый файл присылается хотя бы раз, остальные сообщения - повторы по закону Ципфа
+    picks = list(range(files)) + [int(files ** rng.random()) - 1 for _ in range(count - files)]
+    rng.shuffle(picks)
+    return [(FIRST_USER_ID + rng.randrange(USERS), file_no) for file_no in picks]
+
+
+def own_file_ids(source):
+    """Прежний формат: каждая запись хранит полученную строку file_id."""
+    return [
+        bot.MessageRecord(bot.MessageKind.PHOTO, bot.Sender.USER, None, f"AgACAgIAAxkBAAI{i:012d}{file_no:08d}")
+        for i, (user_id, file_no) in enumerate(source)
+    ]
+
+
+def registry(source):
+    """Реестр: запись ссылается на общий MediaItem, повторная строка file_id заменяет прежнюю."""
+    media = bot.MediaRegistry()
+    records = []
+    for i, (user_id, file_no) in enumerate(source):
+        item, _ = media.add(
+            f"AQAD{file_no:08d}", f"AgACAgIAAxkBAAI{i:012d}{file_no:08d}", bot.MessageKind.PHOTO, 150000, None, user_id
+        )
+        records.append(bot.MessageRecord(bot.MessageKind.PHOTO, bot.Sender.USER, None, item))
+    return records, media
+
+
+def measure(build, source):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    started = time.perf_counter()
+    result = build(source)
+    elapsed = time.perf_counter() - started
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del result
+    return size / len(source), elapsed / len(source)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200000)
+    parser.add_argument("--distinct", type=float, default=0.3, help="доля разных файлов среди сообщений")
+    args = parser.parse_args()
+    source = make_source(args.messages, args.distinct)
+
+    print(f"Сообщений с медиафайлами: {args.messages}, разных файлов: {len({f for _, f in source})}")
+    for title, build in (("своя строка file_id", own_file_ids), ("реестр медиафайлов", registry)):
+        size, per_message = measure(build, source)
+        print(f"  {title:>20}: {size:6.1f} байт на сообщение, {per_message * 1e6:.2f} мкс на сообщение")
+
+
+if __name__ == "__main__":
+    main()
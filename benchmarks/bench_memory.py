@@ -0,0 +1,84 @@
+"""Замер памяти на одну запись истории переписки.
+
+Запуск: python benchmarks/bench_memory.py [количество сообщений]
+
+Сравнивает прежний формат (словарь с шестью ключами) с MessageRecord
+на одинаковом наборе сообщений: тексты, фото и видео с подписью и без,
+голосовые, документы и стикеры. Уникальные строки (тексты, file_id)
+создаются заранее и не входят в замер, поэтому разница показывает
+именно накладные расходы на запись.
+"""
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import BlueTeamSupportBot as bot  # noqa: E402
+
+# Доля сообщений каждого вида: (вид, есть подпись, доля)
+MESSAGE_MIX = [
+    (bot.MessageKind.TEXT, True, 0.60),
+    (bot.MessageKind.PHOTO, False, 0.12),
+    (bot.MessageKind.PHOTO, True, 0.05),
+    (bot.MessageKind.VIDEO, False, 0.04),
+    (bot.MessageKind.VOICE, False, 0.08),
+    (bot.MessageKind.DOCUMENT, True, 0.06),
+    (bot.MessageKind.STICKER, True, 0.05),
+]
+
+
+def make_source(count):
+    """Готовит исходные данные сообщений: (вид, отправитель, текст, file_id)."""
+    rng = random.Random(42)
+    kinds = [(kind, has_text) for kind, has_text, _ in MESSAGE_MIX]
+    weights = [share for _, _, share in MESSAGE_MIX]
+    source = []
+    for i in range(count):
+        kind, has_text = rng.choices(kinds, weights)[0]
+        sender = bot.Sender.USER if rng.random() < 0.7 else bot.Sender.ADMIN
+        text = f"Сообщение пользователя номер {i}" if has_text else bot.MEDIA_PLACEHOLDERS[kind]
+        file_id = None if kind == bot.MessageKind.TEXT else f"AgACAgIAAxkBAAI{i:012d}"
+        source.append((kind, sender, text, file_id))
+    return source
+
+
+def as_dict(kind, sender, text, file_id):
+    """Запись в прежнем формате истории."""
+    return {
+        "type": "text" if kind == bot.MessageKind.TEXT else "media",
+        "content": text,
+        "media_type": bot.MEDIA_TYPE_LABELS[kind],
+        "file_id": file_id,
+        "sender": bot.SENDER_NAMES[sender],
+    }
+
+
+def measure(build, source):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    records = [build(*item) for item in source]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del records
+    return size / len(source)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    source = make_source(count)
+
+    dict_bytes = measure(as_dict, source)
+    record_bytes = measure(bot.MessageRecord.create, source)
+
+    print(f"Сообщений: {count}")
+    print(f"  словарь:        {dict_bytes:7.1f} байт на запись")
+    print(f"  MessageRecord:  {record_bytes:7.1f} байт на запись")
+    print(f"  экономия:       {dict_bytes - record_bytes:7.1f} байт на запись "
+          f"({(1 - record_bytes / dict_bytes) * 100:.0f}%)")
+
+
+if __name__ == "__main__":
+    main()
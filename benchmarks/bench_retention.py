@@ -0,0 +1,156 @@
+"""Вытеснение переписки из памяти (compact): память, время выгрузки и загрузки обратно.
+
+Запуск: python benchmarks/bench_retention.py [--users 20000] [--messages 50] [--budget-share 0.1] [--storage memory]
+
+Заполняет хранилище историями (тексты, фото из реестра медиафайлов,
+голосовые со своим file_id) и выгружает из памяти все, что не помещается
+в бюджет - долю --budget-share от занятого историями. Сначала на небольшой
+выборке память, которая освобождается при выгрузке, замеряется tracemalloc
+и сравнивается с оценкой HistoryRetention (по ней compact решает, что
+выгрузить); tracemalloc сильно замедляет работу, поэтому остальные замеры
+идут без него. Пока идет
+выгрузка, фоновая задача проверяет, насколько опаздывает цикл событий:
+архивы пишутся в потоке и не должны задерживать обработку обновлений. Затем к
+выгруженным историям обращаются в случайном порядке, как при новом
+сообщении пользователя или открытии истории администратором, и
+замеряется задержка загрузки из сжатого архива (memory) или из базы (sqlite).
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import BlueTeamSupportBot as bot  # noqa: E402
+
+FIRST_USER_ID = 500000
+# Сколько выгруженных историй загружается обратно для замера задержки
+REHYDRATE_SAMPLE = 1000
+# Пользователей в выборке для сравнения оценки памяти с tracemalloc
+ACCURACY_SAMPLE = 1000
+TICK = 0.01
+
+
+def fill(storage, users, messages):
+    for user_id in range(FIRST_USER_ID, FIRST_USER_ID + users):
+        for i in range(messages):
+            if i % 10 == 3:
+                item, _ = storage.add_media(user_id, f"AQAD{user_id}{i}", f"AgACAgIAAxkBAAI{user_id}{i:08d}", bot.MessageKind.PHOTO, 85000)
+                record = bot.MessageRecord(bot.MessageKind.PHOTO, bot.Sender.USER, None, item)
+            elif i % 10 == 7:
+                record = bot.MessageRecord(bot.MessageKind.VOICE, bot.Sender.USER, None, f"AwACAgIAAxkBAAI{user_id}{i:08d}")
+            else:
+                sender = bot.Sender.ADMIN if i % 3 == 2 else bot.Sender.USER
+                record = bot.MessageRecord(bot.MessageKind.TEXT, sender, f"Сообщение {i}: не открывается VPN после обновления клиента")
+            storage.add_message(user_id, record)
+        if isinstance(storage, bot.SQLiteStorage) and user_id % 1000 == 999:
+            storage.flush()
+
+
+async def measure_lag(stop, lags):
+    """Записывает, на сколько позже срабатывает sleep(TICK), пока не установлен stop."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - started - TICK)
+
+
+def open_storage(kind, directory):
+    if kind == "sqlite":
+        return bot.SQLiteStorage(os.path.join(directory, "bench.sqlite3"))
+    return bot.MemoryStorage()
+
+
+async def estimate_accuracy(kind, messages):
+    """Возвращает (оценка HistoryRetention, освобождено по tracemalloc) при выгрузке всех историй выборки."""
+    storage = bot.storage = open_storage(kind, tempfile.mkdtemp())
+    # tracemalloc видит только память, выделенную после запуска
+    tracemalloc.start()
+    fill(storage, ACCURACY_SAMPLE, messages)
+    if kind == "sqlite":
+        storage.flush()
+    before = tracemalloc.get_traced_memory()[0]
+    estimated = storage.retention.total_bytes
+    await storage.compact(0, 1)
+    freed = before - tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    await storage.close()
+    return estimated, freed
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--messages", type=int, default=50, help="сообщений на пользователя")
+    parser.add_argument("--budget-share", type=float, default=0.1, help="бюджет памяти как доля занятого историями")
+    parser.add_argument("--storage", choices=("memory", "sqlite"), default="memory")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    directory = tempfile.mkdtemp()
+    bot.HISTORY_ARCHIVE_DIR = os.path.join(directory, "archive")
+    sample_estimated, sample_freed = await estimate_accuracy(args.storage, args.messages)
+
+    storage = bot.storage = open_storage(args.storage, directory)
+    fill(storage, args.users, args.messages)
+    if args.storage == "sqlite":
+        storage.flush()
+
+    estimated = storage.retention.total_bytes
+    budget = int(estimated * args.budget_share)
+    stop = asyncio.Event()
+    lags = []
+    lag_task = asyncio.create_task(measure_lag(stop, lags))
+    started = time.perf_counter()
+    evicted = await storage.compact(0, budget)
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await lag_task
+    kept = storage.retention.total_bytes
+    lags.sort()
+
+    total = args.users * args.messages
+    print(f"{args.users} пользователей по {args.messages} сообщений ({total} записей), хранилище {args.storage}")
+    print(f"  истории в памяти: оценка {bot.format_size(estimated)}, "
+          f"бюджет {bot.format_size(budget)} ({args.budget_share:.0%})")
+    print(f"  выгружено {evicted} историй за {elapsed:.2f} с ({evicted / elapsed:,.0f} историй/с), "
+          f"осталось {len(storage.retention)}, оценка {bot.format_size(kept)}")
+    print(f"  выборка из {ACCURACY_SAMPLE} историй: оценка {bot.format_size(sample_estimated)}, "
+          f"освобождено по tracemalloc {bot.format_size(sample_freed)}")
+    if lags:
+        print(f"  задержка цикла событий во время выгрузки: p50 {lags[len(lags) // 2] * 1000:.1f} мс, "
+              f"максимум {lags[-1] * 1000:.1f} мс")
+    if args.storage == "memory":
+        archived = directory_size(bot.HISTORY_ARCHIVE_DIR)
+        print(f"  архивы: {storage.archived_count()} файлов, {bot.format_size(archived)}, "
+              f"{archived / max(evicted * args.messages, 1):.0f} Б на запись")
+
+    sample = random.Random(42).sample(
+        [user_id for user_id in range(FIRST_USER_ID, FIRST_USER_ID + args.users) if user_id not in storage.messages],
+        min(REHYDRATE_SAMPLE, evicted),
+    )
+    timings = []
+    for user_id in sample:
+        started = time.perf_counter()
+        history = storage.get_history(user_id)
+        timings.append(time.perf_counter() - started)
+        assert len(history) == args.messages
+    timings.sort()
+    if timings:
+        print(f"  загрузка выгруженной истории ({len(timings)} раз): p50 {timings[len(timings) // 2] * 1000:.2f} мс, "
+              f"p99 {timings[int(len(timings) * 0.99)] * 1000:.2f} мс")
+    await storage.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""Замер задержки поиска по переписке (/search).
+
+Запуск: python benchmarks/bench_search.py [количество сообщений]
+
+Заполняет MemoryStorage и SQLiteStorage (FTS5) одинаковыми сообщениями
+из словаря в 5000 слов с частотами по закону Ципфа, затем
+измеряет время storage.search для частых, редких и составных запросов.
+"""
+import asyncio
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import BlueTeamSupportBot as bot  # noqa: E402
+
+VOCABULARY_SIZE = 5000
+WORDS_PER_MESSAGE = 8
+USERS = 5000
+QUERY_REPEATS = 20
+
+
+def make_vocabulary():
+    rng = random.Random(7)
+    letters = "абвгдежзиклмнопрстуфхцчшщэюя"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(VOCABULARY_SIZE)]
+
+
+def make_texts(count, vocabulary):
+    # Частоты слов убывают как в естественном языке (закон Ципфа)
+    rng = random.Random(42)
+    weights = list(itertools.accumulate(1 / rank for rank in range(1, VOCABULARY_SIZE + 1)))
+    return [
+        " ".join(rng.choices(vocabulary, cum_weights=weights, k=WORDS_PER_MESSAGE)) for _ in range(count)
+    ]
+
+
+async def fill(storage, texts):
+    await storage.start()
+    started = time.perf_counter()
+    for i, text in enumerate(texts):
+        record = bot.MessageRecord.create(bot.MessageKind.TEXT, bot.Sender.USER, text)
+        storage.add_message(100000 + i % USERS, record)
+        if i % 1000 == 0:
+            await asyncio.sleep(0)
+    await storage.close()
+    return time.perf_counter() - started
+
+
+def measure_queries(storage, queries):
+    """Возвращает {запрос: (найдено, среднее мс, максимум мс)}."""
+    report = {}
+    for query in queries:
+        timings = []
+        for _ in range(QUERY_REPEATS):
+            started = time.perf_counter()
+            results = storage.search(query, bot.SEARCH_MAX_RESULTS)
+            timings.append(time.perf_counter() - started)
+        report[query] = (len(results), sum(timings) / len(timings) * 1000, max(timings) * 1000)
+    return report
+
+
+def print_report(title, fill_seconds, report):
+    print(title)
+    print(f"  заполнение: {fill_seconds:.1f} с")
+    for query, (found, avg_ms, max_ms) in report.items():
+        print(f"  «{query}»: найдено {found}, среднее {avg_ms:.2f} мс, максимум {max_ms:.2f} мс")
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    vocabulary = make_vocabulary()
+    texts = make_texts(count, vocabulary)
+    queries = [
+        vocabulary[0],  # самое частое слово
+        vocabulary[50],
+        vocabulary[3000],  # редкое слово
+        f"{vocabulary[0]} {vocabulary[1]}",
+        f"{vocabulary[10]} {vocabulary[4000]}",
+        "несуществующееслово",
+        f"несуществующееслово {vocabulary[20]}",  # частичное совпадение
+    ]
+    print(f"Сообщений: {count}, пользователей: {USERS}")
+
+    memory = bot.MemoryStorage()
+    fill_seconds = await fill(memory, texts)
+    print_report("MemoryStorage (индекс в памяти)", fill_seconds, measure_queries(memory, queries))
+    del memory
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sqlite3")
+        fill_seconds = await fill(bot.SQLiteStorage(path), texts)
+        # Поиск идет по базе после перезапуска: в памяти нет ни истории, ни индекса
+        sqlite = bot.SQLiteStorage(path)
+        print_report("SQLiteStorage (FTS5)", fill_seconds, measure_queries(sqlite, queries))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
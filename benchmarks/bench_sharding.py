@@ -0,0 +1,162 @@
+"""Пропускная способность в зависимости от числа процессов-обработчиков.
+
+Запуск: python benchmarks/bench_sharding.py [--updates 3000] [--workers 0 1 2 4] [--latency-ms 0]
+
+Бот запускается целиком, как в рабочем режиме (run_sharded: входной процесс с long
+polling и WORKER_PROCESSES обработчиков; 0 - все в одном процессе), но Bot API
+заменен заглушкой из bench_webhook, работающей в отдельном процессе. Заглушка
+отдает пачку сообщений от разных пользователей через getUpdates и засекает время,
+за которое бот ответит на все: подтверждение пользователю и уведомление
+администратору (два sendMessage на сообщение). Лимиты отправки отключены.
+
+--latency-ms задерживает ответы sendMessage: обработчики одного процесса ждут
+Bot API параллельно не больше чем UPDATE_CONCURRENCY, а уведомления
+администраторам отправляют FANOUT_WORKERS фоновых обработчиков, поэтому при
+задержке процессы ускоряют работу даже на одном ядре; без задержки выигрыш
+ограничен числом ядер.
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import BlueTeamSupportBot as bot  # noqa: E402
+from bench_webhook import StubBotAPI, make_update  # noqa: E402
+
+ADMIN = 1000
+FIRST_USER_ID = 500000
+# Сколько ждать ответа на всю пачку, прежде чем считать запуск неудачным
+RUN_TIMEOUT = 300
+
+
+class CountingBotAPI(StubBotAPI):
+    """Заглушка Bot API, которая считает sendMessage и может отвечать с задержкой."""
+
+    def __init__(self, latency):
+        super().__init__()
+        self.latency = latency
+        self.polling = asyncio.Event()
+        self.sent = 0
+        self.expected = 0
+        self.done = None
+
+    async def _call(self, method, params):
+        if method == "getUpdates":
+            self.polling.set()
+        elif method == "sendMessage":
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            self.sent += 1
+            if self.done is not None and self.sent >= self.expected and not self.done.done():
+                self.done.set_result(time.monotonic())
+        return await super()._call(method, params)
+
+
+async def serve_stub(conn, latency):
+    api = CountingBotAPI(latency)
+    await api.start()
+    conn.send(api.base_url)
+    loop = asyncio.get_running_loop()
+    while True:
+        updates = await loop.run_in_executor(None, conn.recv)
+        if updates is None:
+            break
+        # Ждем, пока бот запустится и начнет опрашивать getUpdates
+        await api.polling.wait()
+        api.polling.clear()
+        api.pending = []
+        api.sent = 0
+        api.expected = 2 * len(updates)
+        api.done = loop.create_future()
+        started = time.monotonic()
+        for update in updates:
+            api.pending.append(update)
+        api.new_update.set()
+        conn.send(await api.done - started)
+    # Отпускаем последний долгий getUpdates, чтобы он не остался незавершенным
+    api.new_update.set()
+    await asyncio.sleep(0.1)
+    await api.stop()
+
+
+def run_stub(conn, latency):
+    asyncio.run(serve_stub(conn, latency))
+
+
+def run_bot(base_url, workers, path):
+    """Процесс бота: run_sharded или, при workers=0, обычный запуск в одном процессе."""
+    bot.ADMIN_ID = ADMIN
+    bot.ADMIN_IDS = {ADMIN}
+    bot.SQLITE_PATH = path
+    bot.OUTBOX_PATH = os.path.join(os.path.dirname(path), "outbox.sqlite3")
+    bot.STATE_PATH = os.path.join(os.path.dirname(path), "state.sqlite3")
+    bot.BROADCAST_PATH = os.path.join(os.path.dirname(path), "broadcasts.sqlite3")
+    bot.WORKER_PROCESSES = workers
+    # Каждое сообщение - отдельная карточка: тексты одного пользователя не склеиваются в одну
+    bot.COALESCE_WINDOW = 0
+    unlimited = float("inf")
+    bot.outbound_scheduler = bot.OutboundScheduler(
+        global_rate=unlimited, chat_rate=unlimited, chat_burst=unlimited, group_rate=unlimited
+    )
+    if workers:
+        bot.run_sharded(base_url)
+    else:
+        bot.storage = bot.SQLiteStorage(path)
+        bot.run_updates(bot.build_application(base_url))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--updates", type=int, default=3000, help="сообщений в пачке")
+    parser.add_argument("--users", type=int, default=500, help="разных пользователей")
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4], help="числа обработчиков")
+    parser.add_argument("--latency-ms", type=float, default=0, help="задержка ответа sendMessage")
+    args = parser.parse_args()
+    # Сообщения о запуске и остановке процессов только мешают выводу
+    logging.disable(logging.INFO)
+
+    context = multiprocessing.get_context("fork")
+    conn, stub_conn = context.Pipe()
+    stub = context.Process(target=run_stub, args=(stub_conn, args.latency_ms / 1000), name="stub")
+    stub.start()
+    base_url = conn.recv()
+
+    print(f"{args.updates} сообщений от {args.users} пользователей, задержка Bot API {args.latency_ms:g} мс, "
+          f"ядер: {os.cpu_count()}")
+    baseline = None
+    update_id = 0
+    for workers in args.workers:
+        path = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+        process = context.Process(target=run_bot, args=(base_url, workers, path), name="bot")
+        process.start()
+        updates = []
+        for i in range(args.updates):
+            update_id += 1
+            updates.append(make_update(update_id, FIRST_USER_ID + i % args.users, f"Сообщение {i}"))
+        conn.send(updates)
+        if not conn.poll(RUN_TIMEOUT):
+            process.kill()
+            stub.kill()
+            sys.exit(f"Бот не ответил на все сообщения за {RUN_TIMEOUT} с (обработчиков: {workers})")
+        elapsed = conn.recv()
+        os.kill(process.pid, signal.SIGINT)
+        process.join()
+
+        rate = args.updates / elapsed
+        baseline = baseline or rate
+        title = f"{workers} обработчиков" if workers else "один процесс"
+        print(f"  {title:>16}: {elapsed:6.2f} с, {rate:7.0f} сообщений/с, x{rate / baseline:.2f}")
+
+    conn.send(None)
+    stub.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Сохранение и восстановление состояния администраторов (restore_state).
+
+Запуск: python benchmarks/bench_state.py [--users 50000] [--admins 20]
+
+Заполняет базу состояниями меню (user_states) и начатыми ответами (replying_to)
+так же, как это делают обработчики, - по одному изменению, и показывает задержку
+одного изменения. Затем состояние восстанавливается заново, как при запуске
+бота (restore_state), и замеряется время восстановления.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import BlueTeamSupportBot as bot  # noqa: E402
+
+FIRST_ADMIN_ID = 1000
+FIRST_USER_ID = 500000
+
+
+def restore(path):
+    """Восстанавливает состояние, как main() при запуске; возвращает SharedStore и затраченное время."""
+    bot.ADMIN_IDS = {FIRST_ADMIN_ID}
+    bot.user_states = {}
+    bot.replying_to = {}
+    started = time.perf_counter()
+    store = bot.restore_state(path)
+    return store, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50000, help="сохраненных состояний меню")
+    parser.add_argument("--admins", type=int, default=20)
+    args = parser.parse_args()
+    # Без предупреждений об администраторах, добавленных не из ADMIN_IDS
+    logging.disable(logging.WARNING)
+    bot.ADMIN_ID = FIRST_ADMIN_ID
+    path = os.path.join(tempfile.mkdtemp(), "state.sqlite3")
+
+    store, _ = restore(path)
+    timings = []
+    for i in range(args.users):
+        started = time.perf_counter()
+        bot.user_states[FIRST_USER_ID + i] = {"action": "add_admin", "step": "waiting_for_id"}
+        timings.append(time.perf_counter() - started)
+    for i in range(args.admins):
+        admin_id = FIRST_ADMIN_ID + i
+        bot.ADMIN_IDS.add(admin_id)
+        bot.replying_to[admin_id] = FIRST_USER_ID + i
+    store.close()
+    timings.sort()
+    print(f"Изменений: {args.users}, задержка одного: "
+          f"p50 {timings[len(timings) // 2] * 1e6:.0f} мкс, p99 {timings[int(len(timings) * 0.99)] * 1e6:.0f} мкс")
+
+    store, elapsed = restore(path)
+    restored = (len(bot.ADMIN_IDS), len(bot.user_states), len(bot.replying_to))
+    store.close()
+    print(f"Восстановление при запуске: {elapsed * 1000:.0f} мс "
+          f"(администраторов {restored[0]}, состояний меню {restored[1]}, ответов {restored[2]}), "
+          f"файл {os.path.getsize(path) / 1024 / 1024:.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
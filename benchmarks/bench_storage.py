@@ -0,0 +1,80 @@
+"""Замер задержки записи в хранилище переписки.
+
+Запуск: python benchmarks/bench_storage.py [количество сообщений]
+
+Показывает, сколько микросекунд добавляет сохранение одного сообщения
+для MemoryStorage и SQLiteStorage (с фоновой пакетной записью),
+а также время загрузки истории пользователя из базы.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import BlueTeamSupportBot as bot  # noqa: E402
+
+
+def make_message(i):
+    return bot.MessageRecord(bot.MessageKind.TEXT, bot.Sender.USER, f"Тестовое сообщение номер {i}")
+
+
+async def measure_writes(storage, count, users=1000):
+    """Возвращает задержку add_message (мкс) в среднем, p50 и p99."""
+    await storage.start()
+    timings = []
+    for i in range(count):
+        user_id = 100000 + i % users
+        started = time.perf_counter()
+        storage.ensure_user(user_id)
+        storage.add_message(user_id, make_message(i))
+        timings.append(time.perf_counter() - started)
+        # Отдаем управление циклу событий, как это происходит между обновлениями
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    flush_started = time.perf_counter()
+    await storage.close()
+    flush_time = time.perf_counter() - flush_started
+    timings.sort()
+    return {
+        "avg_us": sum(timings) / len(timings) * 1e6,
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p99_us": timings[int(len(timings) * 0.99)] * 1e6,
+        "close_ms": flush_time * 1000,
+    }
+
+
+def measure_history_load(path, user_id):
+    storage = bot.SQLiteStorage(path)
+    started = time.perf_counter()
+    history = storage.get_history(user_id)
+    elapsed = time.perf_counter() - started
+    storage.messages.clear()
+    return len(history), elapsed * 1000
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    memory = await measure_writes(bot.MemoryStorage(), count)
+    print(f"MemoryStorage: {count} сообщений")
+    print(f"  add_message: среднее {memory['avg_us']:.2f} мкс, "
+          f"p50 {memory['p50_us']:.2f} мкс, p99 {memory['p99_us']:.2f} мкс")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sqlite3")
+        sqlite = await measure_writes(bot.SQLiteStorage(path), count)
+        print(f"SQLiteStorage (WAL, пакетная запись): {count} сообщений")
+        print(f"  add_message: среднее {sqlite['avg_us']:.2f} мкс, "
+              f"p50 {sqlite['p50_us']:.2f} мкс, p99 {sqlite['p99_us']:.2f} мкс")
+        print(f"  запись остатка при закрытии: {sqlite['close_ms']:.1f} мс")
+        print(f"  добавлено к записи в память: {sqlite['avg_us'] - memory['avg_us']:.2f} мкс")
+
+        loaded, load_ms = measure_history_load(path, 100000)
+        print(f"  загрузка истории пользователя ({loaded} записей): {load_ms:.2f} мс")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,269 @@
+"""Сравнение задержки обработки обновлений: long polling и webhook.
+
+Запуск: python benchmarks/bench_webhook.py [количество обновлений]
+
+Бот собирается через build_application() с теми же обработчиками, что и в
+рабочем режиме, но Bot API заменен локальной заглушкой (base_url). Для каждого
+обновления измеряется время от его появления (в ответе getUpdates или в
+POST-запросе к webhook) до запроса sendMessage с ответом пользователю.
+В конце webhook-сервер заваливается пачкой обновлений, чтобы проверить
+ограниченную очередь: часть запросов должна получить 503.
+"""
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from urllib.parse import parse_qsl
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import BlueTeamSupportBot as bot  # noqa: E402
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+FIRST_USER_ID = 500000
+# Пауза между обновлениями: ниже общего лимита отправки, чтобы замерять прием, а не ожидание лимита
+PAUSE = 2 / bot.GLOBAL_RATE_LIMIT
+
+
+class StubAPIError(Exception):
+    """Ответ заглушки с ошибкой Bot API (например, 403 - пользователь заблокировал бота)."""
+
+    def __init__(self, code, description):
+        super().__init__(description)
+        self.code = code
+        self.description = description
+
+
+class StubBotAPI:
+    """Минимальная заглушка Telegram Bot API: getUpdates, getWebhookInfo, sendMessage и служебные методы."""
+
+    def __init__(self):
+        self.pending = []
+        self.new_update = asyncio.Event()
+        self.waiters = {}  # {chat_id: future, завершается при sendMessage в этот чат}
+        self.calls = 0
+        self.port = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/bot"
+
+    def push_update(self, update):
+        self.pending.append(update)
+        self.new_update.set()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                method = request_line.split()[1].decode().rsplit("/", 1)[-1]
+                if headers.get("content-type", "").startswith("application/json"):
+                    params = json.loads(body or b"{}")
+                else:
+                    params = {key: value for key, value in parse_qsl(body.decode())}
+                try:
+                    status = "200 OK"
+                    payload = {"ok": True, "result": await self._call(method, params)}
+                except StubAPIError as e:
+                    status = f"{e.code} Error"
+                    payload = {"ok": False, "error_code": e.code, "description": e.description}
+                payload = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n".encode()
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _call(self, method, params):
+        self.calls += 1
+        if method == "getMe":
+            return BOT_USER
+        if method == "getUpdates":
+            offset = int(params.get("offset") or 0)
+            self.pending = [update for update in self.pending if update["update_id"] >= offset]
+            if not self.pending:
+                self.new_update.clear()
+                try:
+                    await asyncio.wait_for(self.new_update.wait(), timeout=float(params.get("timeout") or 0))
+                except asyncio.TimeoutError:
+                    pass
+            return self.pending[:100]
+        if method == "getWebhookInfo":
+            return {"url": "", "has_custom_certificate": False, "pending_update_count": len(self.pending)}
+        if method == "sendMessage":
+            chat_id = int(params["chat_id"])
+            waiter = self.waiters.pop(chat_id, None)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(time.perf_counter())
+            return {
+                "message_id": self.calls,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": params.get("text", ""),
+            }
+        return True
+
+
+def make_update(update_id, user_id, text):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Bench"},
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}] if text.startswith("/") else [],
+        },
+    }
+
+
+async def post_update(reader, writer, update, secret=None):
+    """Отправляет обновление webhook-серверу по открытому соединению; возвращает код ответа."""
+    body = json.dumps(update).encode()
+    headers = f"POST {bot.WEBHOOK_PATH} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+    if secret:
+        headers += f"X-Telegram-Bot-Api-Secret-Token: {secret}\r\n"
+    writer.write(headers.encode() + f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    while (await reader.readline()) not in (b"\r\n", b""):
+        pass
+    return status
+
+
+def percentile(values, share):
+    return sorted(values)[min(len(values) - 1, int(len(values) * share))] * 1000
+
+
+def print_latency(title, latencies):
+    print(f"{title}: {len(latencies)} обновлений")
+    print(f"  среднее {sum(latencies) / len(latencies) * 1000:.2f} мс, p50 {percentile(latencies, 0.5):.2f} мс, "
+          f"p95 {percentile(latencies, 0.95):.2f} мс, p99 {percentile(latencies, 0.99):.2f} мс")
+
+
+def expect_reply(api, user_id):
+    """Возвращает future, которое получит время отправки ответа в чат user_id."""
+    waiter = asyncio.get_running_loop().create_future()
+    api.waiters[user_id] = waiter
+    return waiter
+
+
+async def bench_polling(api, count):
+    bot.UPDATE_MODE = "polling"
+    bot.storage = bot.MemoryStorage()
+    application = bot.build_application(base_url=api.base_url)
+    await application.initialize()
+    await application.post_init(application)
+    await application.updater.start_polling(poll_interval=0, timeout=10)
+    await application.start()
+
+    latencies = []
+    for i in range(count):
+        user_id = FIRST_USER_ID + i
+        reply = expect_reply(api, user_id)
+        started = time.perf_counter()
+        api.push_update(make_update(i + 1, user_id, "/help"))
+        latencies.append(await asyncio.wait_for(reply, timeout=10) - started)
+        await asyncio.sleep(PAUSE)
+    await application.updater.stop()
+    await application.stop()
+    await application.post_stop(application)
+    await application.shutdown()
+    await application.post_shutdown(application)
+    return latencies
+
+
+async def bench_webhook(api, count, burst):
+    bot.UPDATE_MODE = "webhook"
+    bot.WEBHOOK_URL = ""
+    bot.storage = bot.MemoryStorage()
+    application = bot.build_application(base_url=api.base_url)
+    secret = "bench-secret"
+    server = bot.WebhookServer(application, "127.0.0.1", 0, bot.WEBHOOK_PATH, secret, queue_timeout=0.5)
+    stop_event = asyncio.Event()
+    runner = asyncio.create_task(bot.run_webhook(application, server, stop_event))
+    while server._server is None:
+        await asyncio.sleep(0.01)
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+    latencies = []
+    for i in range(count):
+        user_id = FIRST_USER_ID + count + i
+        reply = expect_reply(api, user_id)
+        started = time.perf_counter()
+        assert await post_update(reader, writer, make_update(count + i + 1, user_id, "/help"), secret) == 200
+        latencies.append(await asyncio.wait_for(reply, timeout=10) - started)
+        await asyncio.sleep(PAUSE)
+    forbidden = await post_update(reader, writer, make_update(0, FIRST_USER_ID, "/help"), "wrong")
+    writer.close()
+
+    # Пачка обновлений от нескольких соединений, как при доставке накопившихся обновлений
+    async def sender(updates):
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        statuses = [await post_update(reader, writer, update, secret) for update in updates]
+        writer.close()
+        return statuses
+
+    connections = bot.WEBHOOK_MAX_CONNECTIONS
+    updates = [make_update(2 * count + i + 1, FIRST_USER_ID + 2 * count + i, "/help") for i in range(burst)]
+    started = time.perf_counter()
+    results = await asyncio.gather(*(sender(updates[c::connections]) for c in range(connections)))
+    burst_time = time.perf_counter() - started
+    statuses = [status for result in results for status in result]
+
+    stop_event.set()
+    await runner
+    return latencies, forbidden, statuses, burst_time
+
+
+async def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    # Предупреждения об отклоненных обновлениях ожидаемы и только мешают выводу
+    logging.disable(logging.WARNING)
+    burst = 1000
+    # Очередь поменьше, чтобы пачка гарантированно ее переполнила
+    bot.WEBHOOK_QUEUE_SIZE = 64
+    # Ответы на /help не проходят через журнал доставок
+    bot.OUTBOX_PATH = ""
+    api = StubBotAPI()
+    await api.start()
+
+    polling = await bench_polling(api, count)
+    print_latency("Long polling", polling)
+
+    webhook, forbidden, statuses, burst_time = await bench_webhook(api, count, burst)
+    print_latency("Webhook", webhook)
+    print(f"  запрос с неверным секретным токеном: {forbidden}")
+    print(f"  пачка {burst} обновлений через {bot.WEBHOOK_MAX_CONNECTIONS} соединений за {burst_time:.1f} с: "
+          f"принято {statuses.count(200)}, отклонено (503) {statuses.count(503)}")
+    await api.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())